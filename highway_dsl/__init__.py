@@ -1,5 +1,6 @@
 from .workflow_dsl import (
     ActivityOperator,
+    AnyOperator,
     BaseOperator,
     ConditionOperator,
     Duration,
@@ -24,6 +25,7 @@ from .workflow_dsl import (
 
 __all__ = [
     "ActivityOperator",
+    "AnyOperator",
     "BaseOperator",
     "ConditionOperator",
     "Duration",
@@ -1,14 +1,51 @@
 # workflow_dsl.py
 import contextlib
 import re
+import sys
 from abc import ABC
-from collections.abc import Callable
+from collections import Counter
+from collections.abc import Callable, Iterable
 from datetime import datetime, timedelta
 from enum import Enum
-from typing import Any, Optional, Union
+from functools import lru_cache
+from itertools import chain
+from typing import Annotated, Any, Literal, Optional
 
 import yaml
-from pydantic import BaseModel, ConfigDict, Field, model_validator
+from pydantic import (
+    BaseModel,
+    ConfigDict,
+    Field,
+    field_serializer,
+    field_validator,
+    model_validator,
+)
+
+
+try:
+    import orjson
+except ImportError:  # optional dependency, see the "fast" extra
+    orjson = None  # type: ignore[assignment]
+
+try:
+    from yaml import CSafeDumper as _YamlDumper
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:  # PyYAML built without libyaml
+    from yaml import SafeDumper as _YamlDumper  # type: ignore[assignment]
+    from yaml import SafeLoader as _YamlLoader  # type: ignore[assignment]
+
+
+# Shared instances for the durations workflows use most (every 5s up to 5 minutes)
+_COMMON_DURATIONS: dict[float, timedelta] = {n: timedelta(seconds=n) for n in range(0, 301, 5)}
+
+
+def _intern_id(task_id: str) -> str:
+    """Intern a task id, accepting str subclasses such as str-valued Enum members.
+
+    sys.intern() only takes exact str objects. str.__str__ is used rather than
+    str() because a (str, Enum) member's __str__ returns "Cls.MEMBER", not its value.
+    """
+    return sys.intern(str.__str__(task_id))
 
 
 class Duration:
@@ -23,12 +60,14 @@ class Duration:
     @staticmethod
     def seconds(n: int | float) -> timedelta:
         """Create a duration of N seconds."""
-        return timedelta(seconds=n)
+        cached = _COMMON_DURATIONS.get(n)
+        return cached if cached is not None else timedelta(seconds=n)
 
     @staticmethod
     def minutes(n: int | float) -> timedelta:
         """Create a duration of N minutes."""
-        return timedelta(minutes=n)
+        cached = _COMMON_DURATIONS.get(n * 60)
+        return cached if cached is not None else timedelta(minutes=n)
 
     @staticmethod
     def hours(n: int | float) -> timedelta:
@@ -46,7 +85,17 @@ class Duration:
         return timedelta(weeks=n)
 
 
-class OperatorType(Enum):
+class _ValueEnum(str, Enum):
+    """str-valued Enum whose members print as their plain value, like enum.StrEnum."""
+
+    def __str__(self) -> str:
+        return str.__str__(self)
+
+    def __format__(self, format_spec: str) -> str:
+        return str.__format__(str.__str__(self), format_spec)
+
+
+class OperatorType(_ValueEnum):
     TASK = "task"
     CONDITION = "condition"
     WAIT = "wait"
@@ -61,7 +110,7 @@ class OperatorType(Enum):
     ACTIVITY = "activity"
 
 
-class JoinMode(Enum):
+class JoinMode(_ValueEnum):
     """Join operator coordination modes (Temporal-style)."""
 
     ALL_OF = "all_of"  # Wait for all branches to complete (success or failure)
@@ -70,7 +119,7 @@ class JoinMode(Enum):
     ONE_SUCCESS = "one_success"  # Wait for at least one branch to succeed
 
 
-class TriggerRule(Enum):
+class TriggerRule(_ValueEnum):
     """Dependency trigger rules (Airflow-style smart joins) - DEPRECATED: Use JoinOperator."""
 
     ALL_SUCCESS = "all_success"  # All dependencies must succeed (default)
@@ -81,12 +130,16 @@ class TriggerRule(Enum):
 
 
 class RetryPolicy(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     max_retries: int = Field(3, description="Maximum number of retries")
     delay: timedelta = Field(timedelta(seconds=5), description="Delay between retries")
     backoff_factor: float = Field(2.0, description="Factor by which to increase delay")
 
 
 class TimeoutPolicy(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     timeout: timedelta = Field(..., description="Timeout duration")
     kill_on_timeout: bool = Field(
         True,
@@ -97,7 +150,7 @@ class TimeoutPolicy(BaseModel):
 class BaseOperator(BaseModel, ABC):
     task_id: str
     operator_type: OperatorType
-    dependencies: list[str] = Field(default_factory=list)
+    dependencies: tuple[str, ...] = Field(default_factory=tuple)
     trigger_rule: TriggerRule = Field(
         TriggerRule.ALL_SUCCESS, description="Dependency trigger rule for smart joins"
     )
@@ -121,14 +174,22 @@ class BaseOperator(BaseModel, ABC):
         default=False, description="Task is internal to a parallel branch"
     )
 
-    model_config = ConfigDict(use_enum_values=True, arbitrary_types_allowed=True)
+    model_config = ConfigDict(arbitrary_types_allowed=True, defer_build=True)
+
+    def add_dependency(self, task_id: str) -> None:
+        """Append a dependency without scanning the existing ones.
+
+        Duplicates are dropped when WorkflowBuilder.build() canonicalizes
+        dependencies.
+        """
+        self.dependencies = (*self.dependencies, _intern_id(task_id))
 
 
 class TaskOperator(BaseOperator):
     function: str
     args: list[Any] = Field(default_factory=list)
     kwargs: dict[str, Any] = Field(default_factory=dict)
-    operator_type: OperatorType = Field(OperatorType.TASK, frozen=True)
+    operator_type: Literal[OperatorType.TASK] = Field(OperatorType.TASK, frozen=True)
 
 
 class ActivityOperator(BaseOperator):
@@ -136,43 +197,69 @@ class ActivityOperator(BaseOperator):
     function: str = Field(..., description="Function to execute")
     args: list[Any] = Field(default_factory=list)
     kwargs: dict[str, Any] = Field(default_factory=dict)
-    operator_type: OperatorType = Field(OperatorType.ACTIVITY, frozen=True)
+    operator_type: Literal[OperatorType.ACTIVITY] = Field(OperatorType.ACTIVITY, frozen=True)
 
 
 class ConditionOperator(BaseOperator):
     condition: str
     if_true: str | None
     if_false: str | None
-    operator_type: OperatorType = Field(OperatorType.CONDITION, frozen=True)
+    operator_type: Literal[OperatorType.CONDITION] = Field(OperatorType.CONDITION, frozen=True)
+
+
+@lru_cache(maxsize=256)
+def _parse_iso_duration(value: str) -> timedelta:
+    """Parse the ISO 8601 ``PT[nH][nM][n[.n]S]`` subset used for wait_for.
+
+    Components are read in order and a component that does not fit is
+    skipped, so malformed input degrades the same way a prefix regex match
+    would instead of raising. Results are cached: workflows tend to repeat
+    the same few waits, and timedelta is immutable.
+    """
+    rest = value[2:]
+    hours = minutes = 0
+    head, sep, tail = rest.partition("H")
+    if sep and head.isdecimal():
+        hours, rest = int(head), tail
+    head, sep, tail = rest.partition("M")
+    if sep and head.isdecimal():
+        minutes, rest = int(head), tail
+    seconds = 0.0
+    head, sep, _ = rest.partition("S")
+    if sep:
+        whole, dot, fraction = head.partition(".")
+        if whole.isdecimal() and (not dot or fraction.isdecimal()):
+            seconds = float(head)
+    return timedelta(hours=hours, minutes=minutes, seconds=seconds)
+
+
+# Legacy "<tag>:<value>" wait_for formats, keyed by tag
+_WAIT_FOR_PREFIX_PARSERS: dict[str, Callable[[str], timedelta | datetime]] = {
+    "duration": lambda value: timedelta(seconds=float(value)),
+    "datetime": datetime.fromisoformat,
+}
 
 
 class WaitOperator(BaseOperator):
     wait_for: timedelta | datetime | str
-    operator_type: OperatorType = Field(OperatorType.WAIT, frozen=True)
+    operator_type: Literal[OperatorType.WAIT] = Field(OperatorType.WAIT, frozen=True)
 
-    @model_validator(mode="before")
+    @field_validator("wait_for", mode="before")
     @classmethod
-    def parse_wait_for(cls, data: Any) -> Any:
-        if isinstance(data, dict) and "wait_for" in data:
-            wait_for = data["wait_for"]
-            if isinstance(wait_for, str):
-                if wait_for.startswith("PT"):
-                    # ISO 8601 duration format
-                    match = re.match(r"PT(?:(\d+)H)?(?:(\d+)M)?(?:(\d+(?:\.\d+)?)S)?", wait_for)
-                    if match:
-                        hours = int(match.group(1) or 0)
-                        minutes = int(match.group(2) or 0)
-                        seconds = float(match.group(3) or 0)
-                        data["wait_for"] = timedelta(hours=hours, minutes=minutes, seconds=seconds)
-                elif wait_for.startswith("duration:"):  # Backward compatibility
-                    data["wait_for"] = timedelta(seconds=float(wait_for.split(":")[1]))
-                elif wait_for.startswith("datetime:"):  # Backward compatibility
-                    data["wait_for"] = datetime.fromisoformat(wait_for.split(":", 1)[1])
-                else:
-                    # Assume ISO 8601 datetime format
-                    with contextlib.suppress(ValueError):
-                        data["wait_for"] = datetime.fromisoformat(wait_for)
-        return data
+    def parse_wait_for(cls, wait_for: Any) -> Any:
+        # Runs before core validation so JSON strings are parsed the same way as Python ones
+        if isinstance(wait_for, str):
+            tag, _, payload = wait_for.partition(":")
+            parser = _WAIT_FOR_PREFIX_PARSERS.get(tag)
+            if parser is not None:  # Backward compatibility
+                return parser(payload)
+            if wait_for.startswith("PT"):
+                # ISO 8601 duration format
+                return _parse_iso_duration(wait_for)
+            # Assume ISO 8601 datetime format
+            with contextlib.suppress(ValueError):
+                return datetime.fromisoformat(wait_for)
+        return wait_for
 
     def model_dump(self, **kwargs: Any) -> dict[str, Any]:
         data = super().model_dump(**kwargs)
@@ -193,50 +280,22 @@ class ParallelOperator(BaseOperator):
     timeout: int | None = Field(
         None, description="Optional timeout in seconds for branch execution"
     )
-    operator_type: OperatorType = Field(OperatorType.PARALLEL, frozen=True)
+    operator_type: Literal[OperatorType.PARALLEL] = Field(OperatorType.PARALLEL, frozen=True)
 
 
 class ForEachOperator(BaseOperator):
     items: str
-    loop_body: list[
-        Union[
-            TaskOperator,
-            "ActivityOperator",
-            ConditionOperator,
-            WaitOperator,
-            ParallelOperator,
-            "ForEachOperator",
-            "WhileOperator",
-            "EmitEventOperator",
-            "WaitForEventOperator",
-            "SwitchOperator",
-            "JoinOperator",
-        ]
-    ] = Field(default_factory=list)
+    loop_body: list["AnyOperator"] = Field(default_factory=list)
     parallel: bool = Field(
         default=False, description="Execute iterations in parallel (dynamic task mapping)"
     )
-    operator_type: OperatorType = Field(OperatorType.FOREACH, frozen=True)
+    operator_type: Literal[OperatorType.FOREACH] = Field(OperatorType.FOREACH, frozen=True)
 
 
 class WhileOperator(BaseOperator):
     condition: str
-    loop_body: list[
-        Union[
-            TaskOperator,
-            ActivityOperator,
-            ConditionOperator,
-            WaitOperator,
-            ParallelOperator,
-            ForEachOperator,
-            "WhileOperator",
-            "EmitEventOperator",
-            "WaitForEventOperator",
-            "SwitchOperator",
-            "JoinOperator",
-        ]
-    ] = Field(default_factory=list)
-    operator_type: OperatorType = Field(OperatorType.WHILE, frozen=True)
+    loop_body: list["AnyOperator"] = Field(default_factory=list)
+    operator_type: Literal[OperatorType.WHILE] = Field(OperatorType.WHILE, frozen=True)
 
 
 class EmitEventOperator(BaseOperator):
@@ -244,7 +303,7 @@ class EmitEventOperator(BaseOperator):
 
     event_name: str = Field(..., description="Name of the event to emit")
     payload: dict[str, Any] = Field(default_factory=dict, description="Event payload data")
-    operator_type: OperatorType = Field(OperatorType.EMIT_EVENT, frozen=True)
+    operator_type: Literal[OperatorType.EMIT_EVENT] = Field(OperatorType.EMIT_EVENT, frozen=True)
 
 
 class WaitForEventOperator(BaseOperator):
@@ -254,7 +313,9 @@ class WaitForEventOperator(BaseOperator):
     timeout_seconds: int | None = Field(
         None, description="Timeout in seconds (None = wait forever)"
     )
-    operator_type: OperatorType = Field(OperatorType.WAIT_FOR_EVENT, frozen=True)
+    operator_type: Literal[OperatorType.WAIT_FOR_EVENT] = Field(
+        OperatorType.WAIT_FOR_EVENT, frozen=True
+    )
 
 
 class JoinOperator(BaseOperator):
@@ -268,7 +329,7 @@ class JoinOperator(BaseOperator):
     join_mode: JoinMode = Field(
         JoinMode.ALL_OF, description="Coordination mode (all_of, any_of, etc.)"
     )
-    operator_type: OperatorType = Field(OperatorType.JOIN, frozen=True)
+    operator_type: Literal[OperatorType.JOIN] = Field(OperatorType.JOIN, frozen=True)
 
 
 class SwitchOperator(BaseOperator):
@@ -279,27 +340,115 @@ class SwitchOperator(BaseOperator):
         default_factory=dict, description="Map of case values to task IDs"
     )
     default: str | None = Field(None, description="Default task ID if no case matches")
-    operator_type: OperatorType = Field(OperatorType.SWITCH, frozen=True)
+    operator_type: Literal[OperatorType.SWITCH] = Field(OperatorType.SWITCH, frozen=True)
+
+
+_OPERATOR_CLASSES: dict[str, type[BaseOperator]] = {
+    OperatorType.TASK.value: TaskOperator,
+    OperatorType.ACTIVITY.value: ActivityOperator,
+    OperatorType.CONDITION.value: ConditionOperator,
+    OperatorType.WAIT.value: WaitOperator,
+    OperatorType.PARALLEL.value: ParallelOperator,
+    OperatorType.FOREACH.value: ForEachOperator,
+    OperatorType.WHILE.value: WhileOperator,
+    OperatorType.EMIT_EVENT.value: EmitEventOperator,
+    OperatorType.WAIT_FOR_EVENT.value: WaitForEventOperator,
+    OperatorType.SWITCH.value: SwitchOperator,
+    OperatorType.JOIN.value: JoinOperator,
+}
+
+# Any concrete operator, dispatched on the operator_type tag when validated
+AnyOperator = Annotated[
+    TaskOperator
+    | ActivityOperator
+    | ConditionOperator
+    | WaitOperator
+    | ParallelOperator
+    | ForEachOperator
+    | WhileOperator
+    | EmitEventOperator
+    | WaitForEventOperator
+    | SwitchOperator
+    | JoinOperator,
+    Field(discriminator="operator_type"),
+]
+
+
+_WORKFLOW_NAME_RE = re.compile(r"^[a-z][a-z0-9_]*$")
+_WORKFLOW_VERSION_RE = re.compile(r"^[a-zA-Z0-9._-]+$")
+
+
+def _mermaid_condition(task_id: str, task: ConditionOperator, lines: list[str]) -> None:
+    if task.if_true:
+        lines.append(f"    {task_id} --> {task.if_true} : True")
+    if task.if_false:
+        lines.append(f"    {task_id} --> {task.if_false} : False")
+
+
+def _mermaid_parallel(task_id: str, task: ParallelOperator, lines: list[str]) -> None:
+    lines.append(f"    state {task_id} {{")
+    for i, branch in enumerate(task.branches):
+        lines.append(f'        state "Branch {i+1}" as {branch}')
+        if i < len(task.branches) - 1:
+            lines.append("        --")
+    lines.append("    }")
+
+
+def _mermaid_loop(task_id: str, task: ForEachOperator | WhileOperator, lines: list[str]) -> None:
+    lines.append(f"    state {task_id} {{")
+    for sub_task in task.loop_body:
+        if sub_task.description:
+            lines.append(f'        state "{sub_task.description}" as {sub_task.task_id}')
+        else:
+            lines.append(f"        {sub_task.task_id}")
+    lines.append("    }")
+
+
+# Extra mermaid lines for control-flow operators, keyed by operator_type
+_MERMAID_EMITTERS: dict[str, Callable[[str, Any, list[str]], None]] = {
+    OperatorType.CONDITION: _mermaid_condition,
+    OperatorType.PARALLEL: _mermaid_parallel,
+    OperatorType.FOREACH: _mermaid_loop,
+    OperatorType.WHILE: _mermaid_loop,
+}
+_LOOP_OPERATOR_TYPES = frozenset({OperatorType.FOREACH, OperatorType.WHILE})
+
+
+def _kahn_layers(
+    successors: dict[str, tuple[str, ...]], indegree: dict[str, int]
+) -> list[list[str]]:
+    """Group a task graph into execution waves, decrementing indegree in place.
+
+    Raises:
+        ValueError: If the graph contains a cycle
+    """
+    layers = []
+    layer = [task_id for task_id, degree in indegree.items() if degree == 0]
+    scheduled = 0
+    while layer:
+        layers.append(layer)
+        scheduled += len(layer)
+        next_layer = []
+        for task_id in layer:
+            for successor in successors[task_id]:
+                indegree[successor] -= 1
+                if not indegree[successor]:
+                    next_layer.append(successor)
+        layer = next_layer
+    if scheduled != len(indegree):
+        cyclic = sorted(task_id for task_id, degree in indegree.items() if degree)
+        msg = f"Workflow dependencies contain a cycle; unresolved tasks: {', '.join(cyclic)}"
+        raise ValueError(msg)
+    return layers
 
 
 class Workflow(BaseModel):
+    model_config = ConfigDict(defer_build=True)
+
     name: str
     version: str = "2.0.0"
     description: str = ""
-    tasks: dict[
-        str,
-        TaskOperator
-        | ActivityOperator
-        | ConditionOperator
-        | WaitOperator
-        | ParallelOperator
-        | ForEachOperator
-        | WhileOperator
-        | EmitEventOperator
-        | WaitForEventOperator
-        | SwitchOperator
-        | JoinOperator,
-    ] = Field(default_factory=dict)
+    tasks: dict[str, AnyOperator] = Field(default_factory=dict)
     variables: dict[str, Any] = Field(default_factory=dict)
     start_task: str | None = None
 
@@ -308,12 +457,17 @@ class Workflow(BaseModel):
     start_date: datetime | None = Field(None, description="When the schedule becomes active")
     catchup: bool = Field(False, description="Whether to backfill missed runs")
     is_paused: bool = Field(False, description="Whether the workflow is paused")
-    tags: list[str] = Field(default_factory=list, description="Workflow categorization tags")
+    tags: set[str] = Field(default_factory=set, description="Workflow categorization tags")
     max_active_runs: int = Field(1, description="Maximum number of concurrent runs")
     default_retry_policy: RetryPolicy | None = Field(
         None, description="Default retry policy for all tasks"
     )
 
+    @field_serializer("tags")
+    def serialize_tags(self, tags: set[str]) -> list[str]:
+        """Emit tags as a sorted list so serialized output is deterministic."""
+        return sorted(tags)
+
     @model_validator(mode="before")
     @classmethod
     def validate_workflow_name_and_version(cls, data: Any) -> Any:
@@ -330,73 +484,129 @@ class Workflow(BaseModel):
             version = data.get("version", "")
 
             # Check for double underscore (reserved separator)
-            if "__" in name:
-                msg = f"Workflow name '{name}' cannot contain '__' (double underscore) - it's reserved as a separator"
-                raise ValueError(msg)
-
-            if "__" in version:
-                msg = f"Workflow version '{version}' cannot contain '__' (double underscore) - it's reserved as a separator"
+            if "__" in name or "__" in version:
+                if "__" in name:
+                    msg = f"Workflow name '{name}' cannot contain '__' (double underscore) - it's reserved as a separator"
+                else:
+                    msg = f"Workflow version '{version}' cannot contain '__' (double underscore) - it's reserved as a separator"
                 raise ValueError(msg)
 
             # Validate workflow name format
-            if name and not re.match(r"^[a-z][a-z0-9_]*$", name):
+            if name and not _WORKFLOW_NAME_RE.match(name):
                 msg = f"Workflow name '{name}' must start with lowercase letter and contain only lowercase letters, digits, and single underscores"
                 raise ValueError(msg)
 
             # Validate workflow version format (semver compatible)
-            if version and not re.match(r"^[a-zA-Z0-9._-]+$", version):
+            if version and not _WORKFLOW_VERSION_RE.match(version):
                 msg = f"Workflow version '{version}' must contain only alphanumeric characters, dots, hyphens, and underscores (semver compatible)"
                 raise ValueError(msg)
-
         return data
 
     @model_validator(mode="before")
     @classmethod
     def validate_tasks(cls, data: Any) -> Any:
+        """Reject unknown operator types; pydantic dispatches the rest on the tag."""
         if isinstance(data, dict) and "tasks" in data:
-            validated_tasks = {}
-            operator_classes: dict[str, type[BaseOperator]] = {
-                OperatorType.TASK.value: TaskOperator,
-                OperatorType.CONDITION.value: ConditionOperator,
-                OperatorType.WAIT.value: WaitOperator,
-                OperatorType.PARALLEL.value: ParallelOperator,
-                OperatorType.FOREACH.value: ForEachOperator,
-                OperatorType.WHILE.value: WhileOperator,
-                OperatorType.EMIT_EVENT.value: EmitEventOperator,
-                OperatorType.WAIT_FOR_EVENT.value: WaitForEventOperator,
-                OperatorType.SWITCH.value: SwitchOperator,
-                OperatorType.JOIN.value: JoinOperator,
-            }
-            for task_id, task_data in data["tasks"].items():
+            for task_data in data["tasks"].values():
+                if isinstance(task_data, BaseOperator):
+                    # Already a model; pydantic-core passes instances through
+                    continue
                 operator_type = task_data.get("operator_type")
-                if operator_type and operator_type in operator_classes:
-                    operator_class = operator_classes[operator_type]
-                    validated_tasks[task_id] = operator_class.model_validate(task_data)
-                else:
+                if operator_type not in _OPERATOR_CLASSES:
                     msg = f"Unknown operator type: {operator_type}"
                     raise ValueError(msg)
-            data["tasks"] = validated_tasks
         return data
 
     def add_task(
         self,
-        task: (
-            TaskOperator
-            | ActivityOperator
-            | ConditionOperator
-            | WaitOperator
-            | ParallelOperator
-            | ForEachOperator
-            | WhileOperator
-            | EmitEventOperator
-            | WaitForEventOperator
-            | SwitchOperator
-            | JoinOperator
-        ),
+        task: AnyOperator,
     ) -> "Workflow":
         self.tasks[task.task_id] = task
         return self
 
+    def add_tasks(
+        self,
+        tasks: Iterable[AnyOperator],
+    ) -> "Workflow":
+        """Add several tasks in a single dict update."""
+        self.tasks.update((task.task_id, task) for task in tasks)
+        return self
+
+    def get_dag(self) -> tuple[dict[str, tuple[str, ...]], dict[str, int]]:
+        """Return the task graph as (successors, indegree) maps keyed by task_id.
+
+        The graph is derived from the current tasks on every call, so it
+        reflects direct edits to ``tasks`` and task dependencies. Dependencies
+        on ids that are not tasks of this workflow are ignored.
+        """
+        successors: dict[str, list[str]] = {task_id: [] for task_id in self.tasks}
+        indegree = dict.fromkeys(self.tasks, 0)
+        for task_id, task in self.tasks.items():
+            for dep in task.dependencies:
+                if dep in successors:
+                    successors[dep].append(task_id)
+                    indegree[task_id] += 1
+        return {task_id: tuple(succ) for task_id, succ in successors.items()}, indegree
+
+    def topo_layers(self) -> list[list[str]]:
+        """Group task ids into execution waves using Kahn's algorithm.
+
+        Every task in a wave depends only on tasks in earlier waves, so each
+        wave can be dispatched concurrently. Within a wave, tasks keep their
+        insertion order.
+
+        Raises:
+            ValueError: If the dependencies contain a cycle
+        """
+        return _kahn_layers(*self.get_dag())
+
+    def topological_order(self) -> list[str]:
+        """Return task ids ordered so every task follows its dependencies.
+
+        This is topo_layers() flattened.
+
+        Raises:
+            ValueError: If the dependencies contain a cycle
+        """
+        return [task_id for layer in self.topo_layers() for task_id in layer]
+
+    def compute_execution_plan(self) -> tuple[list[list[str]], dict[str, tuple[str, ...]]]:
+        """Return (layers, successors) for dispatching this workflow in waves.
+
+        The plan is derived from the task dependencies and is not serialized
+        with the workflow.
+        """
+        successors, indegree = self.get_dag()
+        return _kahn_layers(successors, indegree), successors
+
+    def on_task_complete(
+        self,
+        task_id: str,
+        pending: dict[str, int],
+        successors: dict[str, tuple[str, ...]],
+    ) -> list[str]:
+        """Record that task_id finished and return the tasks that became ready.
+
+        ``pending`` holds the outstanding dependency counts for one run: start
+        it as ``dict(workflow.get_dag()[1])`` and pass the same dict on every
+        call; it is decremented in place. ``successors`` is the map returned by
+        compute_execution_plan(), so no graph is rebuilt per completion.
+        Independent branches are released as soon as their own dependencies
+        finish, without waiting for a whole wave.
+
+        Raises:
+            ValueError: If task_id is not a task of the plan
+        """
+        if task_id not in successors:
+            msg = f"Unknown task id '{task_id}' completed"
+            raise ValueError(msg)
+        ready = []
+        for successor in successors[task_id]:
+            pending[successor] -= 1
+            if not pending[successor]:
+                ready.append(successor)
+        return ready
+
     def set_variables(self, variables: dict[str, Any]) -> "Workflow":
         self.variables.update(variables)
         return self
@@ -428,7 +638,7 @@ class Workflow(BaseModel):
 
     def add_tags(self, *tags: str) -> "Workflow":
         """Add tags to the workflow."""
-        self.tags.extend(tags)
+        self.tags.update(tags)
         return self
 
     def set_max_active_runs(self, count: int) -> "Workflow":
@@ -441,11 +651,19 @@ class Workflow(BaseModel):
         self.default_retry_policy = policy
         return self
 
+    def to_dict(self) -> dict[str, Any]:
+        """Return the plain data to_yaml() emits, without the YAML round trip."""
+        return self.model_dump(mode="json", by_alias=True, exclude_none=True)
+
     def to_yaml(self) -> str:
-        data = self.model_dump(mode="json", by_alias=True, exclude_none=True)
-        return yaml.dump(data, default_flow_style=False)
+        return yaml.dump(self.to_dict(), Dumper=_YamlDumper, default_flow_style=False)
 
     def to_json(self) -> str:
+        if orjson is not None:
+            data = self.model_dump(mode="json")
+            # orjson rejects integers beyond 64 bits; pydantic serializes them exactly
+            with contextlib.suppress(orjson.JSONEncodeError):
+                return orjson.dumps(data, option=orjson.OPT_INDENT_2).decode()
         return self.model_dump_json(indent=2)
 
     def to_mermaid(
@@ -458,7 +676,7 @@ class Workflow(BaseModel):
 
         for task_id, task in self.tasks.items():
             # Add state with description for regular tasks
-            if task.description and not isinstance(task, (ForEachOperator, WhileOperator)):
+            if task.description and task.operator_type not in _LOOP_OPERATOR_TYPES:
                 lines.append(f'    state "{task.description}" as {task_id}')
 
             # Add dependencies
@@ -469,49 +687,14 @@ class Workflow(BaseModel):
                 for dep in task.dependencies:
                     lines.append(f"    {dep} --> {task_id}")
 
-            # Add transitions for conditional operator
-            if isinstance(task, ConditionOperator):
-                if task.if_true:
-                    lines.append(f"    {task_id} --> {task.if_true} : True")
-                if task.if_false:
-                    lines.append(f"    {task_id} --> {task.if_false} : False")
-
-            # Add composite state for parallel operator
-            if isinstance(task, ParallelOperator):
-                lines.append(f"    state {task_id} {{")
-                for i, branch in enumerate(task.branches):
-                    lines.append(f'        state "Branch {i+1}" as {branch}')
-                    if i < len(task.branches) - 1:
-                        lines.append("        --")
-                lines.append("    }")
-
-            # Add composite state for foreach operator
-            if isinstance(task, ForEachOperator):
-                lines.append(f"    state {task_id} {{")
-                for sub_task in task.loop_body:
-                    if sub_task.description:
-                        lines.append(
-                            f'        state "{sub_task.description}" as {sub_task.task_id}'
-                        )
-                    else:
-                        lines.append(f"        {sub_task.task_id}")
-                lines.append("    }")
-
-            # Add composite state for while operator
-            if isinstance(task, WhileOperator):
-                lines.append(f"    state {task_id} {{")
-                for sub_task in task.loop_body:
-                    if sub_task.description:
-                        lines.append(
-                            f'        state "{sub_task.description}" as {sub_task.task_id}'
-                        )
-                    else:
-                        lines.append(f"        {sub_task.task_id}")
-                lines.append("    }")
+            # Add transitions / composite states for control-flow operators
+            emit = _MERMAID_EMITTERS.get(task.operator_type)
+            if emit is not None:
+                emit(task_id, task, lines)
 
             # End states
             if task_id not in all_dependencies and not (
-                isinstance(task, ConditionOperator) and (task.if_true or task.if_false)
+                task.operator_type == OperatorType.CONDITION and (task.if_true or task.if_false)
             ):
                 lines.append(f"    {task_id} --> [*]")
 
@@ -519,14 +702,74 @@ class Workflow(BaseModel):
 
     @classmethod
     def from_yaml(cls, yaml_str: str) -> "Workflow":
-        data = yaml.safe_load(yaml_str)
+        data = yaml.load(yaml_str, Loader=_YamlLoader)  # noqa: S506 - safe loader
         return cls.model_validate(data)
 
     @classmethod
     def from_json(cls, json_str: str) -> "Workflow":
+        # Not orjson.loads: it silently turns integers beyond 64 bits into floats
         return cls.model_validate_json(json_str)
 
 
+# Builder kwargs that configure the operator rather than the task call
+_OPERATOR_FIELDS = frozenset(
+    {
+        "dependencies",
+        "retry_policy",
+        "timeout_policy",
+        "idempotency_key",
+        "metadata",
+        "description",
+        "result_key",
+        "on_success_task_id",
+        "on_failure_task_id",
+        "trigger_rule",
+    }
+)
+
+
+def _split_kwargs(kwargs: dict[str, Any]) -> tuple[list[Any], dict[str, Any], dict[str, Any]]:
+    """Split task()/activity() builder kwargs into (args, task kwargs, operator config).
+
+    Explicit ``args``/``kwargs`` entries are popped from ``kwargs``; any other
+    key that is not an operator field becomes a task execution parameter.
+    """
+    args = kwargs.pop("args", [])
+    task_kwargs = kwargs.pop("kwargs", {})
+    operator_config = {}
+    for key, value in kwargs.items():
+        if key in _OPERATOR_FIELDS:
+            operator_config[key] = value
+        else:
+            task_kwargs[key] = value
+    return args, task_kwargs, operator_config
+
+
+def _freeze(
+    dependencies: Iterable[str], pool: dict[tuple[str, ...], tuple[str, ...]]
+) -> tuple[str, ...]:
+    """Deduplicate dependencies in first-seen order and intern the tuple in pool.
+
+    The ids themselves are interned too, so they share storage with the task ids
+    interned by WorkflowBuilder._add_task.
+    """
+    key = tuple(map(_intern_id, dependencies))
+    if len(key) > 1:
+        key = tuple(dict.fromkeys(key))
+    return pool.setdefault(key, key)
+
+
+# Policies are frozen, so tasks built with the same arguments share one instance
+@lru_cache(maxsize=256)
+def _retry_policy(max_retries: int, delay: timedelta, backoff_factor: float) -> RetryPolicy:
+    return RetryPolicy(max_retries=max_retries, delay=delay, backoff_factor=backoff_factor)
+
+
+@lru_cache(maxsize=256)
+def _timeout_policy(timeout: timedelta, kill_on_timeout: bool) -> TimeoutPolicy:
+    return TimeoutPolicy(timeout=timeout, kill_on_timeout=kill_on_timeout)
+
+
 class WorkflowBuilder:
     def __init__(
         self,
@@ -549,85 +792,81 @@ class WorkflowBuilder:
                 start_date=None,
                 catchup=False,
                 is_paused=False,
-                tags=[],
+                tags=set(),
                 max_active_runs=1,
                 default_retry_policy=None,
             )
-        self._current_task: str | None = None
+        self._current_task_id: str | None = None
+        # The task object behind _current_task, so fluent modifiers skip the dict lookup
+        self._current_task_obj: AnyOperator | None = None
         self.parent = parent
+        # How many tasks name each task id as their on_success/on_failure handler
+        self._handler_refs: Counter[str] = Counter()
+        # Number of workflow tasks _handler_refs accounts for
+        self._tracked_tasks = 0
+        self._sync_handler_refs()
+
+    @property
+    def _current_task(self) -> str | None:
+        return self._current_task_id
+
+    @_current_task.setter
+    def _current_task(self, task_id: str | None) -> None:
+        self._current_task_id = task_id
+        self._current_task_obj = self.workflow.tasks.get(task_id) if task_id else None
+
+    def _track_handlers(self, task: AnyOperator) -> None:
+        """Count the handler task ids referenced by a task added to this builder."""
+        if task.on_success_task_id:
+            self._handler_refs[task.on_success_task_id] += 1
+        if task.on_failure_task_id:
+            self._handler_refs[task.on_failure_task_id] += 1
+        self._tracked_tasks = len(self.workflow.tasks)
+
+    def _sync_handler_refs(self) -> None:
+        """Recount handler references if tasks reached the workflow without this builder.
+
+        Covers an existing_workflow and tasks inserted directly, e.g. through
+        builder.workflow.add_task(); they show up as a change in the task count.
+        """
+        tasks = self.workflow.tasks
+        if len(tasks) != self._tracked_tasks:
+            self._handler_refs.clear()
+            for task in tasks.values():
+                self._track_handlers(task)
 
     def _add_task(
         self,
-        task: (
-            TaskOperator
-            | ActivityOperator
-            | ConditionOperator
-            | WaitOperator
-            | ParallelOperator
-            | ForEachOperator
-            | WhileOperator
-            | EmitEventOperator
-            | WaitForEventOperator
-            | SwitchOperator
-            | JoinOperator
-        ),
+        task: AnyOperator,
         **kwargs: Any,
     ) -> None:
-        dependencies = kwargs.get("dependencies", [])
+        dependencies = tuple(kwargs.get("dependencies", ()))
 
         # Check if this task is intended to be a handler for another task
         # This can be determined by looking at whether any existing tasks
         # reference this task as their on_failure_task_id or on_success_task_id
-        is_handler_task = False
-        for other_task in self.workflow.tasks.values():
-            # Check if any existing task has this task as its handler
-            if (
-                hasattr(other_task, "on_failure_task_id")
-                and other_task.on_failure_task_id == task.task_id
-            ) or (
-                hasattr(other_task, "on_success_task_id")
-                and other_task.on_success_task_id == task.task_id
-            ):
-                is_handler_task = True
-                break
+        self._sync_handler_refs()
+        is_handler_task = self._handler_refs[task.task_id] > 0
 
         # Only add the current task as dependency if:
         # 1. There IS a current task (not the first task)
         # 2. No explicit dependencies were provided
         # 3. This is NOT a handler task
         if self._current_task and not dependencies and not is_handler_task:
-            dependencies.append(self._current_task)
+            dependencies = (self._current_task,)
 
-        task.dependencies = sorted(set(dependencies))
+        # Deduplicated once in _freeze_dependencies()
+        task.dependencies = dependencies
+        # Task ids recur as dict keys and in other tasks' dependencies
+        task.task_id = _intern_id(task.task_id)
 
         self.workflow.add_task(task)
-        self._current_task = task.task_id
+        self._track_handlers(task)
+        self._current_task_id = task.task_id
+        self._current_task_obj = task
 
     def task(self, task_id: str, function: str, **kwargs: Any) -> "WorkflowBuilder":
-        # Extract args and kwargs if provided, otherwise treat remaining kwargs as task params
-        args = kwargs.pop("args", [])
-        task_kwargs = kwargs.pop("kwargs", {})
-
-        # Operator configuration fields
-        operator_fields = {
-            "dependencies",
-            "retry_policy",
-            "timeout_policy",
-            "idempotency_key",
-            "metadata",
-            "description",
-            "result_key",
-            "on_success_task_id",
-            "on_failure_task_id",
-            "trigger_rule",
-        }
-
-        # Separate operator config from task params
-        operator_config = {k: v for k, v in kwargs.items() if k in operator_fields}
-        task_params = {k: v for k, v in kwargs.items() if k not in operator_fields}
-
-        # Merge task params into kwargs (task execution parameters)
-        task_kwargs.update(task_params)
+        args, task_kwargs, operator_config = _split_kwargs(kwargs)
 
         task = TaskOperator(
             task_id=task_id, function=function, args=args, kwargs=task_kwargs, **operator_config
@@ -637,31 +876,7 @@ class WorkflowBuilder:
 
     def activity(self, task_id: str, function: str, **kwargs: Any) -> "WorkflowBuilder":
         """Add a long-running activity task that executes outside workflow transaction."""
-        # Extract args and kwargs if provided
-        args = kwargs.pop("args", [])
-        task_kwargs = kwargs.pop("kwargs", {})
-
-        # Operator configuration fields
-        operator_fields = {
-            "dependencies",
-            "retry_policy",
-            "timeout_policy",
-            "idempotency_key",
-            "metadata",
-            "description",
-            "result_key",
-            "on_success_task_id",
-            "on_failure_task_id",
-            "trigger_rule",
-        }
-
-        # Separate operator config from task params
-        operator_config = {k: v for k, v in kwargs.items() if k in operator_fields}
-        task_params = {k: v for k, v in kwargs.items() if k not in operator_fields}
-
-        # Merge task params into kwargs (task execution parameters)
-        task_kwargs.update(task_params)
-
+        args, task_kwargs, operator_config = _split_kwargs(kwargs)
         task = ActivityOperator(
             task_id=task_id, function=function, args=args, kwargs=task_kwargs, **operator_config
         )
@@ -692,16 +907,14 @@ class WorkflowBuilder:
 
         self._add_task(task, **kwargs)
 
-        for task_obj in true_builder.workflow.tasks.values():
-            # Only add the condition task as dependency, preserve original dependencies
-            if task_id not in task_obj.dependencies:
-                task_obj.dependencies.append(task_id)
-            self.workflow.add_task(task_obj)
-        for task_obj in false_builder.workflow.tasks.values():
-            # Only add the condition task as dependency, preserve original dependencies
-            if task_id not in task_obj.dependencies:
-                task_obj.dependencies.append(task_id)
-            self.workflow.add_task(task_obj)
+        tasks = self.workflow.tasks
+        for task_obj in chain(
+            true_builder.workflow.tasks.values(), false_builder.workflow.tasks.values()
+        ):
+            # Only add the condition task as dependency, preserve original dependencies.
+            task_obj.add_dependency(task_id)
+            tasks[task_obj.task_id] = task_obj
+            self._track_handlers(task_obj)
 
         self._current_task = task_id
         return self
@@ -735,6 +948,10 @@ class WorkflowBuilder:
             name: list(builder.workflow.tasks.keys()) for name, builder in branch_builders.items()
         }
 
+        # Branch builders are never built, so canonicalize their dependencies here
+        for builder in branch_builders.values():
+            builder._freeze_dependencies()
+
         # Serialize complete branch workflows for execution
         branch_workflows = {
             name: builder.workflow.model_dump(mode="json")
@@ -769,10 +986,6 @@ class WorkflowBuilder:
         loop_builder = loop_body(temp_builder)
         loop_tasks = list(loop_builder.workflow.tasks.values())
 
-        # Mark all loop body tasks as internal to prevent parallel dependency injection
-        for task_obj in loop_tasks:
-            task_obj.is_internal_loop_task = True
-
         # Create the foreach operator
         task = ForEachOperator(
             task_id=task_id,
@@ -787,13 +1000,15 @@ class WorkflowBuilder:
         # Add the foreach task as dependency to the FIRST task in the loop body
         # and preserve the original dependency chain within the loop
         if loop_tasks:
-            first_task = loop_tasks[0]
-            if task_id not in first_task.dependencies:
-                first_task.dependencies.append(task_id)
+            loop_tasks[0].add_dependency(task_id)
 
-            # Add all loop tasks to workflow
-            for task_obj in loop_tasks:
-                self.workflow.add_task(task_obj)
+        # Add all loop tasks to workflow, marked internal to prevent parallel
+        # dependency injection, without modifying their dependencies further
+        tasks = self.workflow.tasks
+        for task_obj in loop_tasks:
+            task_obj.is_internal_loop_task = True
+            tasks[task_obj.task_id] = task_obj
+            self._track_handlers(task_obj)
 
         self._current_task = task_id
         return self
@@ -808,10 +1023,6 @@ class WorkflowBuilder:
         loop_builder = loop_body(WorkflowBuilder(f"{task_id}_loop", parent=self))
         loop_tasks = list(loop_builder.workflow.tasks.values())
 
-        # Mark all loop body tasks as internal to prevent parallel dependency injection
-        for task_obj in loop_tasks:
-            task_obj.is_internal_loop_task = True
-
         task = WhileOperator(
             task_id=task_id,
             condition=condition,
@@ -824,13 +1035,15 @@ class WorkflowBuilder:
         # Fix: Only add the while task as dependency to the FIRST task in the loop body
         # and preserve the original dependency chain within the loop
         if loop_tasks:
-            first_task = loop_tasks[0]
-            if task_id not in first_task.dependencies:
-                first_task.dependencies.append(task_id)
+            loop_tasks[0].add_dependency(task_id)
 
-            # Add all loop tasks to workflow without modifying their dependencies further
-            for task_obj in loop_tasks:
-                self.workflow.add_task(task_obj)
+        # Add all loop tasks to workflow, marked internal to prevent parallel
+        # dependency injection, without modifying their dependencies further
+        tasks = self.workflow.tasks
+        for task_obj in loop_tasks:
+            task_obj.is_internal_loop_task = True
+            tasks[task_obj.task_id] = task_obj
+            self._track_handlers(task_obj)
 
         self._current_task = task_id
         return self
@@ -841,15 +1054,9 @@ class WorkflowBuilder:
         delay: timedelta = timedelta(seconds=5),
         backoff_factor: float = 2.0,
     ) -> "WorkflowBuilder":
-        if self._current_task and isinstance(
-            self.workflow.tasks[self._current_task],
-            TaskOperator,
-        ):
-            self.workflow.tasks[self._current_task].retry_policy = RetryPolicy(
-                max_retries=max_retries,
-                delay=delay,
-                backoff_factor=backoff_factor,
-            )
+        task = self._current_task_obj
+        if isinstance(task, TaskOperator):
+            task.retry_policy = _retry_policy(max_retries, delay, backoff_factor)
         return self
 
     def timeout(
@@ -857,14 +1064,9 @@ class WorkflowBuilder:
         timeout: timedelta,
         kill_on_timeout: bool = True,
     ) -> "WorkflowBuilder":
-        if self._current_task and isinstance(
-            self.workflow.tasks[self._current_task],
-            TaskOperator,
-        ):
-            self.workflow.tasks[self._current_task].timeout_policy = TimeoutPolicy(
-                timeout=timeout,
-                kill_on_timeout=kill_on_timeout,
-            )
+        task = self._current_task_obj
+        if isinstance(task, TaskOperator):
+            task.timeout_policy = _timeout_policy(timeout, kill_on_timeout)
         return self
 
     # Phase 2: Event-based operators
@@ -912,14 +1114,22 @@ class WorkflowBuilder:
     # Phase 3: Callback hooks (applies to current task)
     def on_success(self, success_task_id: str) -> "WorkflowBuilder":
         """Set the task to run when the current task succeeds."""
-        if self._current_task:
-            self.workflow.tasks[self._current_task].on_success_task_id = success_task_id
+        task = self._current_task_obj
+        if task is not None:
+            if task.on_success_task_id:
+                self._handler_refs[task.on_success_task_id] -= 1
+            task.on_success_task_id = success_task_id
+            self._handler_refs[success_task_id] += 1
         return self
 
     def on_failure(self, failure_task_id: str) -> "WorkflowBuilder":
         """Set the task to run when the current task fails."""
-        if self._current_task:
-            self.workflow.tasks[self._current_task].on_failure_task_id = failure_task_id
+        task = self._current_task_obj
+        if task is not None:
+            if task.on_failure_task_id:
+                self._handler_refs[task.on_failure_task_id] -= 1
+            task.on_failure_task_id = failure_task_id
+            self._handler_refs[failure_task_id] += 1
         return self
 
     # Phase 4: Switch operator
@@ -953,40 +1163,40 @@ class WorkflowBuilder:
         self.workflow.version = version
         return self
 
-    # Phase 1: Scheduling methods (delegate to Workflow)
+    # Phase 1: Scheduling methods
     def set_schedule(self, cron: str) -> "WorkflowBuilder":
         """Set the cron schedule for this workflow."""
-        self.workflow.set_schedule(cron)
+        self.workflow.schedule = cron
         return self
 
     def set_start_date(self, start_date: datetime) -> "WorkflowBuilder":
         """Set when the schedule becomes active."""
-        self.workflow.set_start_date(start_date)
+        self.workflow.start_date = start_date
         return self
 
     def set_catchup(self, enabled: bool) -> "WorkflowBuilder":
         """Set whether to backfill missed runs."""
-        self.workflow.set_catchup(enabled)
+        self.workflow.catchup = enabled
         return self
 
     def set_paused(self, paused: bool) -> "WorkflowBuilder":
         """Set whether the workflow is paused."""
-        self.workflow.set_paused(paused)
+        self.workflow.is_paused = paused
         return self
 
     def add_tags(self, *tags: str) -> "WorkflowBuilder":
         """Add tags to the workflow."""
-        self.workflow.add_tags(*tags)
+        self.workflow.tags.update(tags)
         return self
 
     def set_max_active_runs(self, count: int) -> "WorkflowBuilder":
         """Set maximum number of concurrent runs."""
-        self.workflow.set_max_active_runs(count)
+        self.workflow.max_active_runs = count
         return self
 
     def set_default_retry_policy(self, policy: RetryPolicy) -> "WorkflowBuilder":
         """Set default retry policy for all tasks."""
-        self.workflow.set_default_retry_policy(policy)
+        self.workflow.default_retry_policy = policy
         return self
 
     def build(self) -> Workflow:
@@ -995,6 +1205,7 @@ class WorkflowBuilder:
         Validates:
         - Callback task references (on_success/on_failure)
         - Dependency references
+        - Dependencies are acyclic
         - Start task is set
 
         Returns:
@@ -1003,21 +1214,38 @@ class WorkflowBuilder:
         Raises:
             ValueError: If validation fails
         """
-        # Validate callback references
-        for task_id, task in self.workflow.tasks.items():
-            if task.on_success_task_id and task.on_success_task_id not in self.workflow.tasks:
+        tasks = self.workflow.tasks
+
+        # Validate callback references and canonicalize dependencies in one pass
+        pool: dict[tuple[str, ...], tuple[str, ...]] = {}
+        for task_id, task in tasks.items():
+            on_success = task.on_success_task_id
+            if on_success and on_success not in tasks:
                 raise ValueError(
-                    f"Task '{task_id}' references non-existent on_success task "
-                    f"'{task.on_success_task_id}'"
+                    f"Task '{task_id}' references non-existent on_success task '{on_success}'"
                 )
-            if task.on_failure_task_id and task.on_failure_task_id not in self.workflow.tasks:
+            on_failure = task.on_failure_task_id
+            if on_failure and on_failure not in tasks:
                 raise ValueError(
-                    f"Task '{task_id}' references non-existent on_failure task "
-                    f"'{task.on_failure_task_id}'"
+                    f"Task '{task_id}' references non-existent on_failure task '{on_failure}'"
                 )
+            task.dependencies = _freeze(task.dependencies, pool)
 
         # Set start task if not explicitly set
-        if not self.workflow.start_task and self.workflow.tasks:
-            self.workflow.start_task = next(iter(self.workflow.tasks.keys()))
+        if not self.workflow.start_task and tasks:
+            self.workflow.start_task = next(iter(tasks))
+
+        # Reject dependency cycles
+        self.workflow.topo_layers()
 
         return self.workflow
+
+    def _freeze_dependencies(self) -> None:
+        """Canonicalize dependencies into deduplicated tuples, keeping first-seen order.
+
+        Dependencies are no longer mutated once the workflow is built. Identical
+        dependency tuples (e.g. fan-in after a parallel block) share one object.
+        """
+        pool: dict[tuple[str, ...], tuple[str, ...]] = {}
+        for task in self.workflow.tasks.values():
+            task.dependencies = _freeze(task.dependencies, pool)
@@ -0,0 +1,59 @@
+"""Helpers shared by the tests that compare against captured example output."""
+
+import functools
+import re
+from pathlib import Path
+
+import yaml
+
+
+try:
+    from yaml import CSafeLoader as YamlLoader
+except ImportError:  # libyaml not available
+    from yaml import SafeLoader as YamlLoader  # type: ignore[assignment]
+
+
+DATA_DIR = Path(__file__).resolve().parent / "data"
+
+# The YAML document starts at the first "description:" or "name:" line
+_YAML_START_RE = re.compile(r"^[ \t]*(?:description|name):", re.MULTILINE)
+_FOOTER_MARKER = "Successfully generated"
+# Outputs that print several formats mark each with an "=== ... ===" section header
+_YAML_HEADER_RE = re.compile(r"^[ \t]*=== Converting to YAML ===[ \t]*$", re.MULTILINE)
+_SECTION_RE = re.compile(r"^[ \t]*===", re.MULTILINE)
+
+
+def extract_yaml_content(content):
+    """Extract only the YAML portion from the output file"""
+    header = _YAML_HEADER_RE.search(content)
+    if header:
+        # The YAML ends at the next "===" section header after its first line
+        yaml_start = header.end() + 1
+        first_line_end = content.find("\n", yaml_start)
+        section = (
+            _SECTION_RE.search(content, first_line_end + 1) if first_line_end != -1 else None
+        )
+        yaml_end = section.start() if section else len(content)
+        return content[yaml_start:yaml_end].strip()
+
+    match = _YAML_START_RE.search(content)
+    yaml_start = match.start() if match else 0
+
+    # The footer is a dashed separator followed by the success message
+    yaml_end = content.rfind(_FOOTER_MARKER, yaml_start)
+    if yaml_end == -1:
+        yaml_end = len(content)
+    else:
+        yaml_end = content.rfind("\n", yaml_start, yaml_end) + 1
+
+    lines = content[yaml_start:yaml_end].splitlines()
+    while lines and (not lines[-1].strip() or lines[-1].strip().startswith("---")):
+        lines.pop()
+    return "\n".join(lines).strip()
+
+
+@functools.lru_cache(maxsize=None)
+def load_expected(path: Path) -> dict:
+    """Parse the YAML portion of a captured output file once per session."""
+    content = path.read_text()
+    return yaml.load(extract_yaml_content(content), Loader=YamlLoader)  # noqa: S506 - safe loader
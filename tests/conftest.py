@@ -1,5 +1,60 @@
 import os
 import sys
 
+import pytest
+
+from tests.test_agentic_ai_software_workflow import (
+    demonstrate_agentic_dev_platform_workflow,
+)
+from tests.test_car_factory_workflow import demonstrate_car_factory_workflow
+from tests.test_car_factory_workflow_with_fluent_builder import (
+    demonstrate_car_factory_workflow as demonstrate_fluent_car_factory_workflow,
+)
+from tests.test_complex_agentic_workflow import demonstrate_complex_agentic_workflow
+from tests.test_example_usage import (
+    create_complex_workflow,
+    demonstrate_basic_workflow,
+    demonstrate_while_loop,
+)
+
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+# Each demo workflow is built and converted to the data to_yaml() would emit
+# once per session, then shared by its own test and test_all_workflow_examples.
+
+
+@pytest.fixture(scope="session")
+def car_factory_data():
+    return demonstrate_car_factory_workflow().to_dict()
+
+
+@pytest.fixture(scope="session")
+def fluent_car_factory_data():
+    return demonstrate_fluent_car_factory_workflow().to_dict()
+
+
+@pytest.fixture(scope="session")
+def complex_agentic_data():
+    return demonstrate_complex_agentic_workflow().to_dict()
+
+
+@pytest.fixture(scope="session")
+def agentic_ai_software_data():
+    return demonstrate_agentic_dev_platform_workflow().to_dict()
+
+
+@pytest.fixture(scope="session")
+def example_complex_data():
+    return create_complex_workflow().to_dict()
+
+
+@pytest.fixture(scope="session")
+def example_while_data():
+    return demonstrate_while_loop().to_dict()
+
+
+@pytest.fixture(scope="session")
+def example_basic_data():
+    return demonstrate_basic_workflow().to_dict()
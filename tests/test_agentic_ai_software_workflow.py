@@ -1,11 +1,12 @@
 from datetime import timedelta
-from pathlib import Path
-
-import yaml
 
 from highway_dsl import (
     WorkflowBuilder,
 )
+from tests._yaml_utils import DATA_DIR, load_expected
+
+
+_EXPECTED_FILE = DATA_DIR / "test_driven_agentic_ai_software_workflow.yaml"
 
 
 def demonstrate_agentic_dev_platform_workflow():
@@ -237,60 +238,12 @@ def demonstrate_agentic_dev_platform_workflow():
     return workflow
 
 
-def extract_yaml_content(content):
-    """Extract only the YAML portion from the output file"""
-    lines = content.split("\n")
-
-    # The YAML content starts after the header line and ends before the footer
-    # Header: "--- AI AGENTIC DEVELOPER WORKFLOW YAML (MASSIVE) ---" at line 0
-    # YAML starts from line 1 (description: '')
-    # Footer starts with the separator line and continues with success message
-
-    # Find the first line that contains YAML content
-    yaml_start = 0
-    for i, line in enumerate(lines):
-        if line.strip().startswith("description:") or line.strip().startswith("name:"):
-            yaml_start = i
-            break
-
-    # Find the end - look for the separator line before the footer
-    yaml_end = len(lines)
-    for i in range(len(lines) - 1, yaml_start, -1):
-        line = lines[i].strip()
-        if line == "---------------------------------------------------":
-            # This is typically the start of the footer, so everything before this is YAML
-            yaml_end = i
-            break
-        if "Successfully generated" in line:
-            # Sometimes the separator might be missing, so look for the success message
-            yaml_end = i
-            # Then go backwards to find the actual end of YAML content
-            while yaml_end > yaml_start and (
-                lines[yaml_end - 1].strip() == ""
-                or lines[yaml_end - 1].strip().startswith("---")
-                or lines[yaml_end - 1].strip()
-                == "---------------------------------------------------"
-            ):
-                yaml_end -= 1
-            break
-
-    # Extract and return the YAML content
-    yaml_content = "\n".join(lines[yaml_start:yaml_end])
-    return yaml_content.strip()
-
-
-def test_agentic_ai_software_workflow():
+def test_agentic_ai_software_workflow(agentic_ai_software_data):
     """Test the agentic AI software workflow generates expected YAML"""
-    workflow = demonstrate_agentic_dev_platform_workflow()
-    generated_yaml = workflow.to_yaml()
-    generated_data = yaml.safe_load(generated_yaml)
+    generated_data = agentic_ai_software_data
 
     # Load expected output
-    expected_file = Path(__file__).parent / "data" / "test_driven_agentic_ai_software_workflow.yaml"
-    with open(expected_file) as f:
-        content = f.read()
-        expected_content = extract_yaml_content(content)
-        expected_data = yaml.safe_load(expected_content)
+    expected_data = load_expected(_EXPECTED_FILE)
 
     # Compare the structure and key elements
     assert generated_data["name"] == expected_data["name"]
@@ -313,8 +266,8 @@ def test_agentic_ai_software_workflow():
     # Validate the generated YAML matches expected (ignoring the header)
     assert generated_data["name"] == expected_data["name"]
     assert generated_data["version"] == expected_data["version"]
-    assert set(generated_data["tasks"].keys()) == set(expected_data["tasks"].keys())
+    assert generated_data["tasks"].keys() == expected_data["tasks"].keys()
 
 
 if __name__ == "__main__":
-    test_agentic_ai_software_workflow()
+    test_agentic_ai_software_workflow(demonstrate_agentic_dev_platform_workflow().to_dict())
@@ -11,14 +11,24 @@ from tests.test_complex_agentic_workflow import test_complex_agentic_workflow
 from tests.test_example_usage import test_example_usage_workflows
 
 
-def test_all_workflow_examples():
+def test_all_workflow_examples(
+    car_factory_data,
+    fluent_car_factory_data,
+    complex_agentic_data,
+    example_complex_data,
+    example_while_data,
+    example_basic_data,
+    agentic_ai_software_data,
+):
     """Run all workflow example tests"""
-    test_car_factory_workflow()
-    test_car_factory_workflow_with_fluent_builder()
-    test_complex_agentic_workflow()
-    test_example_usage_workflows()
-    test_agentic_ai_software_workflow()
+    test_car_factory_workflow(car_factory_data)
+    test_car_factory_workflow_with_fluent_builder(fluent_car_factory_data)
+    test_complex_agentic_workflow(complex_agentic_data)
+    test_example_usage_workflows(example_complex_data, example_while_data, example_basic_data)
+    test_agentic_ai_software_workflow(agentic_ai_software_data)
 
 
 if __name__ == "__main__":
-    test_all_workflow_examples()
+    import pytest
+
+    raise SystemExit(pytest.main([__file__]))
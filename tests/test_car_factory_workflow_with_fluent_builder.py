@@ -1,13 +1,14 @@
 from datetime import timedelta
-from pathlib import Path
-
-import yaml
 
 from highway_dsl import (
     RetryPolicy,
     TimeoutPolicy,
     WorkflowBuilder,
 )
+from tests._yaml_utils import DATA_DIR, load_expected
+
+
+_EXPECTED_FILE = DATA_DIR / "car_factory_workflow_with_fluent_builder.yaml"
 
 
 def create_vehicle_sub_workflow_builder(builder: WorkflowBuilder) -> WorkflowBuilder:
@@ -169,59 +170,12 @@ def demonstrate_car_factory_workflow():
     return workflow
 
 
-def extract_yaml_content(content):
-    """Extract only the YAML portion from the output file"""
-    lines = content.split("\n")
-
-    # The YAML content starts after the header line and ends before the footer
-    # Header: "--- CAR FACTORY WORKFLOW YAML (FLUENT + WHILE LOOP) ---" at line 0
-    # YAML starts from line 1 (description: '')
-    # Footer starts with the separator line and continues with success message
-
-    # Find the first line that contains YAML content
-    yaml_start = 0
-    for i, line in enumerate(lines):
-        if line.strip().startswith("description:") or line.strip().startswith("name:"):
-            yaml_start = i
-            break
-
-    # Find the end - look for the separator line before the footer
-    yaml_end = len(lines)
-    for i in range(len(lines) - 1, yaml_start, -1):
-        line = lines[i].strip()
-        if line == "---------------------------------------------":
-            # This is typically the start of the footer, so everything before this is YAML
-            yaml_end = i
-            break
-        if "Successfully generated" in line:
-            # Sometimes the separator might be missing, so look for the success message
-            yaml_end = i
-            # Then go backwards to find the actual end of YAML content
-            while yaml_end > yaml_start and (
-                lines[yaml_end - 1].strip() == ""
-                or lines[yaml_end - 1].strip().startswith("---")
-                or lines[yaml_end - 1].strip() == "---------------------------------------------"
-            ):
-                yaml_end -= 1
-            break
-
-    # Extract and return the YAML content
-    yaml_content = "\n".join(lines[yaml_start:yaml_end])
-    return yaml_content.strip()
-
-
-def test_car_factory_workflow_with_fluent_builder():
+def test_car_factory_workflow_with_fluent_builder(fluent_car_factory_data):
     """Test the car factory workflow with fluent builder generates expected YAML"""
-    workflow = demonstrate_car_factory_workflow()
-    generated_yaml = workflow.to_yaml()
-    generated_data = yaml.safe_load(generated_yaml)
+    generated_data = fluent_car_factory_data
 
     # Load expected output
-    expected_file = Path(__file__).parent / "data" / "car_factory_workflow_with_fluent_builder.yaml"
-    with open(expected_file) as f:
-        content = f.read()
-        expected_content = extract_yaml_content(content)
-        expected_data = yaml.safe_load(expected_content)
+    expected_data = load_expected(_EXPECTED_FILE)
 
     # Compare the structure and key elements
     assert generated_data["name"] == expected_data["name"]
@@ -240,8 +194,8 @@ def test_car_factory_workflow_with_fluent_builder():
     # Validate the generated YAML matches expected (ignoring the header)
     assert generated_data["name"] == expected_data["name"]
     assert generated_data["version"] == expected_data["version"]
-    assert set(generated_data["tasks"].keys()) == set(expected_data["tasks"].keys())
+    assert generated_data["tasks"].keys() == expected_data["tasks"].keys()
 
 
 if __name__ == "__main__":
-    test_car_factory_workflow_with_fluent_builder()
+    test_car_factory_workflow_with_fluent_builder(demonstrate_car_factory_workflow().to_dict())
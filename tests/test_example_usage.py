@@ -1,13 +1,15 @@
+from collections import Counter
 from datetime import timedelta
-from pathlib import Path
-
-import yaml
 
 from highway_dsl import (
     RetryPolicy,
     Workflow,
     WorkflowBuilder,
 )
+from tests._yaml_utils import DATA_DIR, load_expected
+
+
+_EXPECTED_FILE = DATA_DIR / "example_usage.yaml"
 
 
 def demonstrate_while_loop():
@@ -151,79 +153,15 @@ def demonstrate_basic_workflow():
     return workflow
 
 
-def extract_yaml_content(content):
-    """Extract only the YAML portion from the output file"""
-    lines = content.split("\n")
-
-    # For example_usage, the file contains output from multiple workflows
-    # The first YAML workflow is in the "Converting to YAML" section
-    # Find the line with "=== Converting to YAML ==="
-    yaml_header_idx = -1
-    for i, line in enumerate(lines):
-        if line.strip() == "=== Converting to YAML ===":
-            yaml_header_idx = i
-            break
-
-    if yaml_header_idx != -1:
-        # The YAML content starts after the header
-        yaml_start = yaml_header_idx + 1
-
-        # Find the end - either the next section header or the next '==='
-        yaml_end = len(lines)
-        for i in range(yaml_start, len(lines)):
-            if lines[i].strip().startswith("===") and i > yaml_start:
-                yaml_end = i
-                break
-
-        # Extract and return the YAML content
-        yaml_content = "\n".join(lines[yaml_start:yaml_end])
-        return yaml_content.strip()
-
-    # Fallback: look for the first YAML content as before
-    yaml_start = 0
-    for i, line in enumerate(lines):
-        if line.strip().startswith("description:") or line.strip().startswith("name:"):
-            yaml_start = i
-            break
-
-    # Find the end by looking for the next section or success message
-    yaml_end = len(lines)
-    for i in range(len(lines) - 1, yaml_start, -1):
-        line = lines[i].strip()
-        if line.startswith("==="):
-            yaml_end = i
-            # Find the actual end of YAML content by going backwards
-            while yaml_end > yaml_start and lines[yaml_end - 1].strip() == "":
-                yaml_end -= 1
-            break
-        if "Successfully generated" in line:
-            yaml_end = i
-            while yaml_end > yaml_start and (
-                lines[yaml_end - 1].strip() == "" or lines[yaml_end - 1].strip().startswith("---")
-            ):
-                yaml_end -= 1
-            break
-
-    # Extract and return the YAML content
-    yaml_content = "\n".join(lines[yaml_start:yaml_end])
-    return yaml_content.strip()
-
-
-def test_example_usage_workflows():
+def test_example_usage_workflows(example_complex_data, example_while_data, example_basic_data):
     """Test the example usage workflows generate expected YAML"""
     # Test complex workflow (the first one in the combined output)
-    complex_workflow = create_complex_workflow()
-    complex_yaml = complex_workflow.to_yaml()
-    complex_data = yaml.safe_load(complex_yaml)
+    complex_data = example_complex_data
 
     # Load expected output
-    expected_file = Path(__file__).parent / "data" / "example_usage.yaml"
-    with open(expected_file) as f:
-        content = f.read()
-        # The example_usage.py output contains multiple workflows combined,
-        # so we need to extract the complex workflow portion specifically
-        expected_content = extract_yaml_content(content)
-        expected_data = yaml.safe_load(expected_content)
+    # The example_usage.py output contains multiple workflows combined,
+    # so load_expected extracts the complex workflow portion specifically
+    expected_data = load_expected(_EXPECTED_FILE)
 
     # Compare basic properties (the first workflow in the file should be the complex one)
     # The content contains multiple workflows, so let's just check that we have a complex structure
@@ -237,18 +175,14 @@ def test_example_usage_workflows():
     assert isinstance(complex_data["tasks"], dict)
 
     # Test while loop workflow
-    while_workflow = demonstrate_while_loop()
-    while_yaml = while_workflow.to_yaml()
-    while_data = yaml.safe_load(while_yaml)
+    while_data = example_while_data
 
     assert while_data["name"] == "qa_rework_workflow"
     assert "qa_rework_loop" in while_data["tasks"]
     assert while_data["tasks"]["qa_rework_loop"]["operator_type"] == "while"
 
     # Test basic workflow
-    basic_workflow = demonstrate_basic_workflow()
-    basic_yaml = basic_workflow.to_yaml()
-    basic_data = yaml.safe_load(basic_yaml)
+    basic_data = example_basic_data
 
     assert basic_data["name"] == "simple_etl"
     assert "extract" in basic_data["tasks"]
@@ -257,21 +191,15 @@ def test_example_usage_workflows():
     assert basic_data["tasks"]["transform"]["operator_type"] == "task"
 
     # Check that complex workflow has multiple types of operators
-    task_count = 0
-    condition_count = 0
-    parallel_count = 0
-    for task in complex_data["tasks"].values():
-        if task["operator_type"] == "task":
-            task_count += 1
-        elif task["operator_type"] == "condition":
-            condition_count += 1
-        elif task["operator_type"] == "parallel":
-            parallel_count += 1
-
-    assert task_count > 0
-    assert condition_count > 0
-    assert parallel_count > 0
+    operator_counts = Counter(task["operator_type"] for task in complex_data["tasks"].values())
+    assert operator_counts["task"] > 0
+    assert operator_counts["condition"] > 0
+    assert operator_counts["parallel"] > 0
 
 
 if __name__ == "__main__":
-    test_example_usage_workflows()
+    test_example_usage_workflows(
+        create_complex_workflow().to_dict(),
+        demonstrate_while_loop().to_dict(),
+        demonstrate_basic_workflow().to_dict(),
+    )
@@ -1,4 +1,5 @@
-import os  # noqa: F401
+import os
+from collections import Counter
 from pathlib import Path
 
 import pytest
@@ -15,18 +16,36 @@ from highway_dsl import (
 
 # Define the output directory for Mermaid diagrams
 MERMAID_TEST_RESULTS_DIR = Path("/tmp/highway_dsl/mermaid_test_results")
+# Diagrams are only written out for inspection when MERMAID_DUMP=1
+_DUMP_MERMAID = os.environ.get("MERMAID_DUMP") == "1"
+
+
+# Diagrams collected during the session, written out once at teardown
+_PENDING_MERMAID_FILES: dict[str, str] = {}
 
 
 @pytest.fixture(scope="session", autouse=True)
-def create_mermaid_test_dir():
-    """Create the directory for Mermaid test results if it doesn't exist."""
+def write_mermaid_test_results():
+    """Write the collected Mermaid diagrams once all tests have run."""
+    yield
+    if not _PENDING_MERMAID_FILES:
+        return
     MERMAID_TEST_RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    for workflow_name, mermaid_content in _PENDING_MERMAID_FILES.items():
+        (MERMAID_TEST_RESULTS_DIR / f"{workflow_name}.mermaid").write_text(mermaid_content)
 
 
 def save_mermaid_file(workflow_name: str, mermaid_content: str):
-    """Saves the Mermaid diagram to a file."""
-    file_path = MERMAID_TEST_RESULTS_DIR / f"{workflow_name}.mermaid"
-    file_path.write_text(mermaid_content)
+    """Queue the Mermaid diagram to be saved at the end of the session."""
+    if _DUMP_MERMAID:
+        _PENDING_MERMAID_FILES[workflow_name] = mermaid_content
+
+
+def assert_mermaid_equal(mermaid_diagram: str, expected_mermaid: str):
+    """Compare diagrams line by line, ignoring line order but not repeated lines."""
+    assert Counter(mermaid_diagram.strip().splitlines()) == Counter(
+        expected_mermaid.strip().splitlines()
+    )
 
 
 def test_single_task_workflow_to_mermaid():
@@ -44,9 +63,7 @@ def test_single_task_workflow_to_mermaid():
     task1 --> [*]"""
 
     # Compare the generated diagram with the expected one
-    assert "\n".join(sorted(mermaid_diagram.strip().split("\n"))) == "\n".join(
-        sorted(expected_mermaid.strip().split("\n"))
-    )
+    assert_mermaid_equal(mermaid_diagram, expected_mermaid)
 
 
 def test_simple_linear_workflow_to_mermaid():
@@ -68,9 +85,7 @@ def test_simple_linear_workflow_to_mermaid():
     task3 --> [*]"""
 
     # Compare the generated diagram with the expected one
-    assert "\n".join(sorted(mermaid_diagram.strip().split("\n"))) == "\n".join(
-        sorted(expected_mermaid.strip().split("\n"))
-    )
+    assert_mermaid_equal(mermaid_diagram, expected_mermaid)
 
 
 def test_conditional_workflow_to_mermaid():
@@ -110,14 +125,15 @@ def test_conditional_workflow_to_mermaid():
 
     # Compare the generated diagram with the expected one
     # Normalize line endings and remove leading/trailing whitespace
-    assert "\n".join(sorted(mermaid_diagram.strip().split("\n"))) == "\n".join(
-        sorted(expected_mermaid.strip().split("\n"))
-    )
+    assert_mermaid_equal(mermaid_diagram, expected_mermaid)
 
 
-def test_parallel_workflow_to_mermaid():
+@pytest.mark.parametrize(
+    "workflow_name", ["parallel_workflow", "parallel_workflow_with_composite_state"]
+)
+def test_parallel_workflow_to_mermaid(workflow_name):
     # Create a parallel workflow
-    workflow = Workflow(name="parallel_workflow", start_task="start_task")
+    workflow = Workflow(name=workflow_name, start_task="start_task")
     workflow.add_task(TaskOperator(task_id="start_task", function="start_func"))
     workflow.add_task(
         ParallelOperator(
@@ -157,62 +173,32 @@ def test_parallel_workflow_to_mermaid():
 
     # Compare the generated diagram with the expected one
     # Normalize line endings and remove leading/trailing whitespace
-    assert "\n".join(sorted(mermaid_diagram.strip().split("\n"))) == "\n".join(
-        sorted(expected_mermaid.strip().split("\n"))
-    )
-
-
-def test_while_workflow_with_composite_state_to_mermaid():
-    # Create a while workflow
-    workflow = Workflow(name="while_workflow_with_composite_state", start_task="start_task")
-    workflow.add_task(TaskOperator(task_id="start_task", function="start_func"))
-    workflow.add_task(
-        WhileOperator(
-            task_id="while_task",
-            condition="x > 10",
-            loop_body=[TaskOperator(task_id="t1", function="t1_func", description="Task 1")],
-            dependencies=["start_task"],
-        )
-    )
-    workflow.add_task(
-        TaskOperator(task_id="end_task", function="end_func", dependencies=["while_task"])
-    )
+    assert_mermaid_equal(mermaid_diagram, expected_mermaid)
 
-    # Generate the Mermaid diagram
-    mermaid_diagram = workflow.to_mermaid()
-    save_mermaid_file(workflow.name, mermaid_diagram)
 
-    # Define the expected Mermaid diagram
-    expected_mermaid = """stateDiagram-v2
-    [*] --> start_task
-    start_task --> while_task
-    state while_task {
-        state "Task 1" as t1
-    }
-    while_task --> end_task
-    end_task --> [*]"""
-
-    # Compare the generated diagram with the expected one
-    # Normalize line endings and remove leading/trailing whitespace
-    assert "\n".join(sorted(mermaid_diagram.strip().split("\n"))) == "\n".join(
-        sorted(expected_mermaid.strip().split("\n"))
+@pytest.mark.parametrize(
+    ("loop_type", "loop_operator", "loop_kwargs"),
+    [
+        ("while", WhileOperator, {"condition": "x > 10"}),
+        ("foreach", ForEachOperator, {"items": "items"}),
+    ],
+)
+def test_loop_workflow_with_composite_state_to_mermaid(loop_type, loop_operator, loop_kwargs):
+    # Create a while/foreach workflow
+    workflow = Workflow(
+        name=f"{loop_type}_workflow_with_composite_state", start_task="start_task"
     )
-
-
-def test_foreach_workflow_with_composite_state_to_mermaid():
-    # Create a foreach workflow
-    workflow = Workflow(name="foreach_workflow_with_composite_state", start_task="start_task")
     workflow.add_task(TaskOperator(task_id="start_task", function="start_func"))
     workflow.add_task(
-        ForEachOperator(
-            task_id="foreach_task",
-            items="items",
+        loop_operator(
+            task_id=f"{loop_type}_task",
             loop_body=[TaskOperator(task_id="t1", function="t1_func", description="Task 1")],
             dependencies=["start_task"],
+            **loop_kwargs,
         )
     )
     workflow.add_task(
-        TaskOperator(task_id="end_task", function="end_func", dependencies=["foreach_task"])
+        TaskOperator(task_id="end_task", function="end_func", dependencies=[f"{loop_type}_task"])
     )
 
     # Generate the Mermaid diagram
@@ -220,67 +206,18 @@ def test_foreach_workflow_with_composite_state_to_mermaid():
     save_mermaid_file(workflow.name, mermaid_diagram)
 
     # Define the expected Mermaid diagram
-    expected_mermaid = """stateDiagram-v2
+    expected_mermaid = f"""stateDiagram-v2
     [*] --> start_task
-    start_task --> foreach_task
-    state foreach_task {
+    start_task --> {loop_type}_task
+    state {loop_type}_task {{
         state "Task 1" as t1
-    }
-    foreach_task --> end_task
-    end_task --> [*]"""
-
-    # Compare the generated diagram with the expected one
-    # Normalize line endings and remove leading/trailing whitespace
-    assert "\n".join(sorted(mermaid_diagram.strip().split("\n"))) == "\n".join(
-        sorted(expected_mermaid.strip().split("\n"))
-    )
-
-
-def test_parallel_workflow_with_composite_state_to_mermaid():
-    # Create a parallel workflow
-    workflow = Workflow(name="parallel_workflow_with_composite_state", start_task="start_task")
-    workflow.add_task(TaskOperator(task_id="start_task", function="start_func"))
-    workflow.add_task(
-        ParallelOperator(
-            task_id="parallel_task",
-            branches={"b1": ["t1"], "b2": ["t2"]},
-            dependencies=["start_task"],
-        )
-    )
-    workflow.add_task(
-        TaskOperator(task_id="t1", function="t1_func", dependencies=["parallel_task"])
-    )
-    workflow.add_task(
-        TaskOperator(task_id="t2", function="t2_func", dependencies=["parallel_task"])
-    )
-    workflow.add_task(
-        TaskOperator(task_id="end_task", function="end_func", dependencies=["t1", "t2"])
-    )
-
-    # Generate the Mermaid diagram
-    mermaid_diagram = workflow.to_mermaid()
-    save_mermaid_file(workflow.name, mermaid_diagram)
-
-    # Define the expected Mermaid diagram
-    expected_mermaid = """stateDiagram-v2
-    [*] --> start_task
-    start_task --> parallel_task
-    state parallel_task {
-        state "Branch 1" as b1
-        --
-        state "Branch 2" as b2
-    }
-    parallel_task --> t1
-    parallel_task --> t2
-    t1 --> end_task
-    t2 --> end_task
+    }}
+    {loop_type}_task --> end_task
     end_task --> [*]"""
 
     # Compare the generated diagram with the expected one
     # Normalize line endings and remove leading/trailing whitespace
-    assert "\n".join(sorted(mermaid_diagram.strip().split("\n"))) == "\n".join(
-        sorted(expected_mermaid.strip().split("\n"))
-    )
+    assert_mermaid_equal(mermaid_diagram, expected_mermaid)
 
 
 def test_state_with_description_to_mermaid():
@@ -305,6 +242,28 @@ def test_state_with_description_to_mermaid():
     task2 --> [*]"""
 
     # Compare the generated diagram with the expected one
-    assert "\n".join(sorted(mermaid_diagram.strip().split("\n"))) == "\n".join(
-        sorted(expected_mermaid.strip().split("\n"))
-    )
+    assert_mermaid_equal(mermaid_diagram, expected_mermaid)
+
+
+def test_edited_workflow_to_mermaid():
+    # Render, then edit the tasks directly and render again
+    workflow = Workflow(name="edited_workflow", start_task="x")
+    workflow.add_task(TaskOperator(task_id="x", function="fx"))
+    workflow.add_task(TaskOperator(task_id="y", function="fy", dependencies=["x"]))
+    workflow.to_mermaid()
+
+    workflow.tasks["z"] = TaskOperator(task_id="z", function="fz", dependencies=["y"])
+    workflow.tasks["y"].dependencies = ()
+
+    mermaid_diagram = workflow.to_mermaid()
+    save_mermaid_file(workflow.name, mermaid_diagram)
+
+    # Define the expected Mermaid diagram
+    expected_mermaid = """stateDiagram-v2
+    [*] --> x
+    x --> [*]
+    y --> z
+    z --> [*]"""
+
+    # Compare the generated diagram with the expected one
+    assert_mermaid_equal(mermaid_diagram, expected_mermaid)
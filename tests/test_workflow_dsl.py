@@ -1,16 +1,21 @@
-import json
 from datetime import datetime, timedelta
+from enum import Enum
 
 import pytest
+import yaml
+from pydantic import ValidationError
 
 from highway_dsl import (
+    ActivityOperator,
     ConditionOperator,
     ForEachOperator,
+    JoinMode,
     OperatorType,
     ParallelOperator,
     RetryPolicy,
     TaskOperator,
     TimeoutPolicy,
+    TriggerRule,
     WaitOperator,
     WhileOperator,
     Workflow,
@@ -18,6 +23,10 @@ from highway_dsl import (
 )
 
 
+# A fixed timestamp keeps the wait operator tests deterministic
+FIXED_NOW = datetime(2024, 1, 1, 12, 0, 0)
+
+
 def test_workflow_builder_while_loop():
     workflow = (
         WorkflowBuilder("while_loop_workflow")
@@ -30,17 +39,11 @@ def test_workflow_builder_while_loop():
         .build()
     )
     assert "loop" in workflow.tasks
-    assert workflow.tasks["loop"].dependencies == ["initial"]
+    assert workflow.tasks["loop"].dependencies == ("initial",)
     assert isinstance(workflow.tasks["loop"], WhileOperator)
     assert "loop_task" in workflow.tasks
 
 
-def sort_dict_recursively(d):
-    if not isinstance(d, dict):
-        return d
-    return {k: sort_dict_recursively(v) for k, v in sorted(d.items())}
-
-
 def test_workflow_creation():
     workflow = Workflow(
         name="test_workflow",
@@ -55,6 +58,12 @@ def test_workflow_creation():
     assert workflow.start_task is None
 
 
+def test_workflow_accepts_operator_instances():
+    task = TaskOperator(task_id="task1", function="func1")
+    workflow = Workflow(name="test_workflow", tasks={"task1": task})
+    assert workflow.tasks["task1"] == task
+
+
 def test_add_task_to_workflow():
     workflow = Workflow(name="test_workflow")
     task = TaskOperator(task_id="task1", function="func1")
@@ -63,6 +72,96 @@ def test_add_task_to_workflow():
     assert workflow.tasks["task1"] == task
 
 
+def test_add_tasks_to_workflow():
+    workflow = Workflow(name="test_workflow")
+    task1 = TaskOperator(task_id="task1", function="func1")
+    task2 = TaskOperator(task_id="task2", function="func2", dependencies=["task1"])
+    workflow.add_tasks([task1, task2])
+    assert list(workflow.tasks) == ["task1", "task2"]
+    assert workflow.tasks["task2"] == task2
+
+
+def test_workflow_get_dag():
+    workflow = (
+        WorkflowBuilder("dag_workflow")
+        .task("a", "func_a")
+        .task("b", "func_b")
+        .task("c", "func_c", dependencies=["a"])
+        .build()
+    )
+    successors, indegree = workflow.get_dag()
+    assert successors == {"a": ("b", "c"), "b": (), "c": ()}
+    assert indegree == {"a": 0, "b": 1, "c": 1}
+
+    workflow.tasks["d"] = TaskOperator(task_id="d", function="func_d", dependencies=["c"])
+    workflow.tasks["b"].dependencies = ()
+    successors, indegree = workflow.get_dag()
+    assert successors == {"a": ("c",), "b": (), "c": ("d",), "d": ()}
+    assert indegree == {"a": 0, "b": 0, "c": 1, "d": 1}
+
+
+def test_workflow_copy_sees_updated_tasks():
+    workflow = WorkflowBuilder("copy_workflow").task("x", "f").task("y", "g").build()
+    workflow.topological_order()
+    copy = workflow.model_copy(update={"tasks": {"z": TaskOperator(task_id="z", function="h")}})
+    assert copy.topological_order() == ["z"]
+    assert "z --> [*]" in copy.to_mermaid()
+
+
+def test_workflow_topological_order():
+    workflow = Workflow(name="topo_workflow")
+    workflow.add_tasks(
+        [
+            TaskOperator(task_id="report", function="f", dependencies=["train", "clean"]),
+            TaskOperator(task_id="train", function="f", dependencies=["clean"]),
+            TaskOperator(task_id="fetch", function="f"),
+            TaskOperator(task_id="clean", function="f", dependencies=["fetch"]),
+        ]
+    )
+    assert workflow.topological_order() == ["fetch", "clean", "train", "report"]
+    assert workflow.topo_layers() == [["fetch"], ["clean"], ["train"], ["report"]]
+
+    workflow.add_task(TaskOperator(task_id="lint", function="f", dependencies=["fetch"]))
+    assert workflow.topo_layers() == [["fetch"], ["clean", "lint"], ["train"], ["report"]]
+
+    workflow.tasks["fetch"].dependencies = ("report",)
+    with pytest.raises(ValueError, match="cycle"):
+        workflow.topological_order()
+
+
+def test_workflow_builder_rejects_dependency_cycle():
+    builder = (
+        WorkflowBuilder("cyclic_workflow")
+        .task("a", "func_a", dependencies=["b"])
+        .task("b", "func_b", dependencies=["a"])
+    )
+    with pytest.raises(ValueError, match="cycle"):
+        builder.build()
+
+
+def test_workflow_execution_plan():
+    workflow = (
+        WorkflowBuilder("plan_workflow")
+        .task("fetch", "fetch_data")
+        .task("slow", "slow_step")
+        .task("fast", "fast_step", dependencies=["fetch"])
+        .task("publish", "publish_step", dependencies=["fast"])
+        .build()
+    )
+    layers, successors = workflow.compute_execution_plan()
+    assert layers == [["fetch"], ["slow", "fast"], ["publish"]]
+    assert successors["fetch"] == ("slow", "fast")
+
+    pending = dict(workflow.get_dag()[1])
+    assert workflow.on_task_complete("fetch", pending, successors) == ["slow", "fast"]
+    # publish does not wait for the unrelated slow task
+    assert workflow.on_task_complete("fast", pending, successors) == ["publish"]
+    assert workflow.on_task_complete("slow", pending, successors) == []
+    with pytest.raises(ValueError, match="Unknown task id 'missing'"):
+        workflow.on_task_complete("missing", pending, successors)
+    assert "execution_plan" not in workflow.to_yaml()
+
+
 def test_set_variables():
     workflow = Workflow(name="test_workflow")
     workflow.set_variables({"key1": "value1"})
@@ -108,12 +207,23 @@ def test_task_operator_model():
     assert task.args == ["arg1"]
     assert task.kwargs == {"kwarg1": "value1"}
     assert task.result_key == "res1"
-    assert task.dependencies == ["dep1"]
+    assert task.dependencies == ("dep1",)
     assert task.retry_policy.max_retries == 1
     assert task.timeout_policy.timeout == timedelta(seconds=30)
     assert task.metadata == {"meta1": "data1"}
 
 
+def test_operator_add_dependency():
+    task = TaskOperator(task_id="task1", function="func1", dependencies=["dep1"])
+    task.add_dependency("dep2")
+    task.add_dependency("dep1")
+    assert task.dependencies == ("dep1", "dep2", "dep1")
+
+    workflow = Workflow(name="dedup_workflow").add_task(task)
+    built = WorkflowBuilder(workflow.name, existing_workflow=workflow).build()
+    assert built.tasks["task1"].dependencies == ("dep1", "dep2")
+
+
 def test_condition_operator_model():
     condition = ConditionOperator(
         task_id="cond1",
@@ -127,7 +237,7 @@ def test_condition_operator_model():
     assert condition.condition == "x > 5"
     assert condition.if_true == "task_true"
     assert condition.if_false == "task_false"
-    assert condition.dependencies == ["prev_task"]
+    assert condition.dependencies == ("prev_task",)
 
 
 def test_wait_operator_model():
@@ -135,7 +245,7 @@ def test_wait_operator_model():
     assert wait_duration.wait_for == timedelta(hours=1)
     assert wait_duration.operator_type == OperatorType.WAIT
 
-    now = datetime.now().replace(microsecond=0)
+    now = FIXED_NOW
     wait_datetime = WaitOperator(task_id="wait2", wait_for=now)
     assert wait_datetime.wait_for == now
 
@@ -177,7 +287,7 @@ def test_while_operator_model():
     assert while_op.operator_type == OperatorType.WHILE
     assert while_op.condition == "x < 5"
     assert while_op.loop_body == [task]
-    assert while_op.dependencies == ["prev_task"]
+    assert while_op.dependencies == ("prev_task",)
 
 
 def test_wait_operator_serialization():
@@ -187,7 +297,7 @@ def test_wait_operator_serialization():
     assert dump["wait_for"] == "PT3600.0S"  # ISO 8601 duration format
 
     # Test with datetime - uses ISO 8601 datetime format
-    now = datetime.now().replace(microsecond=0)
+    now = FIXED_NOW
     wait_datetime = WaitOperator(task_id="wait2", wait_for=now)
     dump = wait_datetime.model_dump()
     assert dump["wait_for"] == now.isoformat()  # ISO 8601 datetime format
@@ -211,6 +321,30 @@ def test_wait_operator_serialization():
     assert WaitOperator.model_validate({"task_id": "t", "wait_for": "event"}).wait_for == "event"
 
 
+@pytest.mark.parametrize(
+    ("wait_for", "expected"),
+    [
+        ("PT3600.0S", timedelta(hours=1)),
+        ("PT1H30M", timedelta(hours=1, minutes=30)),
+        ("PT2H5M7.5S", timedelta(hours=2, minutes=5, seconds=7.5)),
+        ("PT", timedelta(0)),
+        ("PT1.5H", timedelta(0)),
+    ],
+)
+def test_wait_operator_iso_duration_parsing(wait_for, expected):
+    assert WaitOperator.model_validate({"task_id": "t", "wait_for": wait_for}).wait_for == expected
+
+
+@pytest.mark.parametrize("wait_for", ["30", "PT1.5H", "P1D", "PT90S", "2024-01-01T12:00:00"])
+def test_wait_operator_json_parsing_matches_python(wait_for):
+    from_python = WaitOperator.model_validate({"task_id": "t", "wait_for": wait_for}).wait_for
+    from_json = WaitOperator.model_validate_json(
+        f'{{"task_id": "t", "wait_for": "{wait_for}"}}'
+    ).wait_for
+    assert from_json == from_python
+    assert type(from_json) is type(from_python)
+
+
 def test_workflow_builder_simple_chain():
     workflow = (
         WorkflowBuilder("simple_chain")
@@ -221,10 +355,46 @@ def test_workflow_builder_simple_chain():
     assert workflow.name == "simple_chain"
     assert "start" in workflow.tasks
     assert "middle" in workflow.tasks
-    assert workflow.tasks["middle"].dependencies == ["start"]
+    assert workflow.tasks["middle"].dependencies == ("start",)
     assert workflow.start_task == "start"
 
 
+def test_workflow_builder_accepts_enum_task_ids():
+    class Step(str, Enum):
+        FETCH = "fetch"
+        STORE = "store"
+
+    workflow = (
+        WorkflowBuilder("enum_ids")
+        .task(Step.FETCH, "fetch_func")
+        .task(Step.STORE, "store_func")
+        .build()
+    )
+    assert list(workflow.tasks) == ["fetch", "store"]
+    assert type(workflow.tasks["fetch"].task_id) is str
+    assert workflow.tasks["store"].dependencies == ("fetch",)
+
+
+def test_workflow_builder_accepts_enum_dependencies():
+    class Step(str, Enum):
+        FETCH = "fetch"
+
+    workflow = (
+        WorkflowBuilder("enum_deps")
+        .task("fetch", "fetch_func")
+        .task("store", "store_func", dependencies=[Step.FETCH, "fetch"])
+        .build()
+    )
+    dependencies = workflow.tasks["store"].dependencies
+    assert dependencies == ("fetch",)
+    assert type(dependencies[0]) is str
+
+    task = TaskOperator(task_id="audit", function="audit_func")
+    task.add_dependency(Step.FETCH)
+    assert task.dependencies == ("fetch",)
+    assert type(task.dependencies[0]) is str
+
+
 def test_workflow_builder_with_retry_and_timeout():
     workflow = (
         WorkflowBuilder("retry_timeout_workflow")
@@ -238,6 +408,86 @@ def test_workflow_builder_with_retry_and_timeout():
     assert workflow.tasks["step1"].timeout_policy.timeout == timedelta(minutes=1)
 
 
+def test_workflow_builder_validates_operator_config():
+    workflow = (
+        WorkflowBuilder("coerced_workflow")
+        .task("step1", "func1", retry_policy={"max_retries": 2}, trigger_rule="all_done")
+        .build()
+    )
+    task = workflow.tasks["step1"]
+    assert isinstance(task.retry_policy, RetryPolicy)
+    assert task.retry_policy.max_retries == 2
+    assert task.trigger_rule == TriggerRule.ALL_DONE
+
+
+def test_workflow_builder_handler_tasks_skip_auto_dependency():
+    workflow = (
+        WorkflowBuilder("handler_workflow")
+        .task("charge", "charge_card")
+        .on_failure("refund")
+        .on_success("stale_handler")
+        .on_success("notify")
+        .task("ship", "ship_order")
+        .task("refund", "refund_card")
+        .task("notify", "send_email")
+        .task("stale_handler", "noop")
+        .build()
+    )
+    assert workflow.tasks["ship"].dependencies == ("charge",)
+    assert workflow.tasks["refund"].dependencies == ()
+    assert workflow.tasks["notify"].dependencies == ()
+    # Replaced handlers are chained like any other task
+    assert workflow.tasks["stale_handler"].dependencies == ("notify",)
+
+
+def test_workflow_builder_reattached_handler_tasks_skip_auto_dependency():
+    existing = Workflow(name="reattached_workflow")
+    existing.add_task(
+        TaskOperator(task_id="charge", function="charge_card", on_failure_task_id="refund")
+    )
+    builder = WorkflowBuilder("reattached_workflow", existing_workflow=existing)
+    builder.task("ship", "ship_order", dependencies=["charge"])
+    builder.task("refund", "refund_card")
+    # Tasks added straight to the workflow are seen too
+    builder.workflow.add_task(
+        TaskOperator(task_id="audit", function="audit_order", on_success_task_id="notify")
+    )
+    builder.task("notify", "send_email")
+    builder.task("archive", "archive_order")
+    workflow = builder.build()
+
+    assert workflow.tasks["refund"].dependencies == ()
+    assert workflow.tasks["notify"].dependencies == ()
+    assert workflow.tasks["archive"].dependencies == ("notify",)
+
+
+def test_workflow_builder_shares_frozen_policies():
+    workflow = (
+        WorkflowBuilder("shared_policy_workflow")
+        .task("step1", "func1")
+        .retry(max_retries=2)
+        .task("step2", "func2")
+        .retry(max_retries=2)
+        .build()
+    )
+    policy = workflow.tasks["step1"].retry_policy
+    assert workflow.tasks["step2"].retry_policy is policy
+    with pytest.raises(ValidationError):
+        policy.max_retries = 10
+
+
+def test_workflow_builder_validates_policies():
+    workflow = (
+        WorkflowBuilder("validated_policy_workflow")
+        .task("step1", "func1")
+        .retry(backoff_factor=3)
+        .build()
+    )
+    backoff_factor = workflow.tasks["step1"].retry_policy.backoff_factor
+    assert backoff_factor == 3.0
+    assert isinstance(backoff_factor, float)
+
+
 def test_workflow_builder_condition():
     workflow = (
         WorkflowBuilder("conditional_workflow")
@@ -251,7 +501,7 @@ def test_workflow_builder_condition():
         .build()
     )
     assert "check" in workflow.tasks
-    assert workflow.tasks["check"].dependencies == ["initial"]
+    assert workflow.tasks["check"].dependencies == ("initial",)
     assert workflow.tasks["check"].if_true == "high"
     assert workflow.tasks["check"].if_false == "low"
     assert "high" in workflow.tasks
@@ -272,7 +522,7 @@ def test_workflow_builder_parallel():
         .build()
     )
     assert "parallel_step" in workflow.tasks
-    assert workflow.tasks["parallel_step"].dependencies == ["init"]
+    assert workflow.tasks["parallel_step"].dependencies == ("init",)
     # After fork-only fix, branch tasks are stored in branch_workflows, not parent tasks
     parallel_op = workflow.tasks["parallel_step"]
     assert "b1" in parallel_op.branch_workflows
@@ -293,9 +543,9 @@ def test_workflow_builder_foreach():
         .build()
     )
     assert "loop_items" in workflow.tasks
-    assert workflow.tasks["loop_items"].dependencies == ["fetch_items"]
+    assert workflow.tasks["loop_items"].dependencies == ("fetch_items",)
     assert "process_item" in workflow.tasks
-    assert workflow.tasks["process_item"].dependencies == ["loop_items"]
+    assert workflow.tasks["process_item"].dependencies == ("loop_items",)
 
 
 def test_workflow_yaml_round_trip():
@@ -311,9 +561,7 @@ def test_workflow_yaml_round_trip():
 
     yaml_output = original_workflow.to_yaml()
     loaded_workflow = Workflow.from_yaml(yaml_output)
-    assert sort_dict_recursively(
-        json.loads(original_workflow.model_dump_json()),
-    ) == sort_dict_recursively(json.loads(loaded_workflow.model_dump_json()))
+    assert original_workflow.model_dump(mode="json") == loaded_workflow.model_dump(mode="json")
 
 
 def test_workflow_json_round_trip():
@@ -334,9 +582,32 @@ def test_workflow_json_round_trip():
     json_output = original_workflow.to_json()
     loaded_workflow = Workflow.from_json(json_output)
 
-    assert sort_dict_recursively(
-        json.loads(original_workflow.model_dump_json()),
-    ) == sort_dict_recursively(json.loads(loaded_workflow.model_dump_json()))
+    assert original_workflow.model_dump(mode="json") == loaded_workflow.model_dump(mode="json")
+
+
+def test_workflow_json_round_trip_big_int_with_orjson():
+    pytest.importorskip("orjson")
+    workflow = Workflow(name="big_int_workflow", variables={"big": 2**70})
+
+    json_output = workflow.to_json()
+    assert json_output == workflow.model_dump_json(indent=2)
+    loaded = Workflow.from_json(json_output)
+    assert loaded.variables["big"] == 2**70
+    assert isinstance(loaded.variables["big"], int)
+
+
+def test_workflow_subclass_round_trip():
+    class OwnedWorkflow(Workflow):
+        owner: str = "me"
+
+    workflow = OwnedWorkflow(name="owned_workflow", owner="ops")
+    workflow.add_task(TaskOperator(task_id="step1", function="func1"))
+
+    from_yaml = OwnedWorkflow.from_yaml(workflow.to_yaml())
+    from_json = OwnedWorkflow.from_json(workflow.to_json())
+    assert isinstance(from_yaml, OwnedWorkflow)
+    assert isinstance(from_json, OwnedWorkflow)
+    assert from_yaml.owner == from_json.owner == "ops"
 
 
 def test_complex_workflow_creation_and_serialization():
@@ -419,17 +690,15 @@ def test_complex_workflow_creation_and_serialization():
     )
 
     # Test serialization and deserialization
+    expected = workflow.model_dump(mode="json")
+
     yaml_output = workflow.to_yaml()
     loaded_workflow_from_yaml = Workflow.from_yaml(yaml_output)
-    assert sort_dict_recursively(
-        json.loads(workflow.model_dump_json()),
-    ) == sort_dict_recursively(json.loads(loaded_workflow_from_yaml.model_dump_json()))
+    assert expected == loaded_workflow_from_yaml.model_dump(mode="json")
 
     json_output = workflow.to_json()
     loaded_workflow_from_json = Workflow.from_json(json_output)
-    assert sort_dict_recursively(
-        json.loads(workflow.model_dump_json()),
-    ) == sort_dict_recursively(json.loads(loaded_workflow_from_json.model_dump_json()))
+    assert expected == loaded_workflow_from_json.model_dump(mode="json")
 
 
 def test_unknown_operator_type_raises_error():
@@ -441,3 +710,76 @@ def test_unknown_operator_type_raises_error():
     """
     with pytest.raises(ValueError, match="Unknown operator type: unknown_operator"):
         Workflow.from_yaml(yaml_content)
+
+
+def test_activity_operator_yaml_round_trip():
+    workflow = (
+        WorkflowBuilder("activity_workflow")
+        .task("prepare", "prepare_func")
+        .activity("train", "train_model", args=["{{data}}"])
+        .build()
+    )
+    loaded_workflow = Workflow.from_yaml(workflow.to_yaml())
+    assert isinstance(loaded_workflow.tasks["train"], ActivityOperator)
+    assert loaded_workflow.tasks["train"].function == "train_model"
+    assert loaded_workflow.tasks["train"].dependencies == ("prepare",)
+
+
+def test_nested_loop_body_yaml_round_trip():
+    workflow = (
+        WorkflowBuilder("nested_loop_workflow")
+        .foreach(
+            "outer",
+            "{{items}}",
+            lambda b: b.task("step", "step_func").while_loop(
+                "inner", "retry < 3", lambda w: w.task("attempt", "attempt_func")
+            ),
+        )
+        .build()
+    )
+    loaded_workflow = Workflow.from_yaml(workflow.to_yaml())
+    outer_body = loaded_workflow.tasks["outer"].loop_body
+    assert isinstance(outer_body[1], WhileOperator)
+    assert isinstance(outer_body[1].loop_body[0], TaskOperator)
+
+
+def test_workflow_round_trip_preserves_enum_fields():
+    workflow = (
+        WorkflowBuilder("enum_round_trip")
+        .task("a", "func_a")
+        .task("b", "func_b", trigger_rule=TriggerRule.ALL_DONE)
+        .join("j", ["a", "b"], JoinMode.ANY_OF)
+        .build()
+    )
+    assert Workflow.from_json(workflow.to_json()) == workflow
+    loaded_workflow = Workflow.from_yaml(workflow.to_yaml())
+    assert loaded_workflow == workflow
+    assert loaded_workflow.tasks["j"].join_mode is JoinMode.ANY_OF
+    assert str(loaded_workflow.tasks["j"].join_mode) == "any_of"
+    assert f"{loaded_workflow.tasks['b'].trigger_rule}" == "all_done"
+
+
+def test_workflow_tags_deduplicated_and_sorted():
+    workflow = (
+        WorkflowBuilder("tagged_workflow")
+        .add_tags("etl", "daily")
+        .add_tags("daily", "analytics")
+        .task("a", "func_a")
+        .build()
+    )
+    assert workflow.tags == {"analytics", "daily", "etl"}
+    assert yaml.safe_load(workflow.to_yaml())["tags"] == ["analytics", "daily", "etl"]
+    assert Workflow.from_json(workflow.to_json()).tags == workflow.tags
+
+
+def test_workflow_to_dict_matches_yaml():
+    workflow = (
+        WorkflowBuilder("to_dict_workflow")
+        .set_schedule("0 2 * * *")
+        .set_start_date(datetime(2025, 1, 1))
+        .task("a", "func_a", retry_policy=RetryPolicy(max_retries=2, delay=timedelta(seconds=5)))
+        .wait("pause", timedelta(minutes=5))
+        .task("b", "func_b")
+        .build()
+    )
+    assert workflow.to_dict() == yaml.safe_load(workflow.to_yaml())